@@ -1,22 +1,22 @@
 import json
 import os
 import shutil
-import keyring
-import base64
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-
-SERVICE_NAME = "EgyptISPQuotaChecker"
-ACCOUNT_USER = "LocalEncryptionKey" # The 'user' in credential manager for the key
+import time
+from secret_store import SERVICE_NAME, get_session
+from providers import DEFAULT_PROVIDER
+
 APP_DATA_DIR = os.path.join(os.getenv('APPDATA'), SERVICE_NAME)
 DATA_FILE = os.path.join(APP_DATA_DIR, "accounts.enc")
 
 class AccountManager:
-    def __init__(self):
+    def __init__(self, session=None):
         self._ensure_app_data()
-        self.key = self._get_or_create_key()
-        self.cipher = Fernet(self.key)
+        # Shared per process so the keyring lookup is paid once per session, not per instance
+        self.session = session or get_session()
+        # Fail here, like the old keyring lookup did, rather than showing an empty account list
+        self.session.unlock()
+        self._load_failed = False
+        self.load_error = None  # Shown to the user when accounts.enc couldn't be read
         self.accounts = self.load_accounts()
 
     def _ensure_app_data(self):
@@ -35,19 +35,6 @@ class AccountManager:
             except Exception as e:
                 print(f"Failed to migrate accounts file: {e}")
 
-    def _get_or_create_key(self):
-        # Try to get key from Windows Credential Manager
-        stored_key = keyring.get_password(SERVICE_NAME, ACCOUNT_USER)
-        
-        if stored_key:
-            return base64.urlsafe_b64decode(stored_key)
-        else:
-            # Generate new key
-            new_key = Fernet.generate_key()
-            # Store in Credential Manager (base64 encoded string)
-            keyring.set_password(SERVICE_NAME, ACCOUNT_USER, base64.urlsafe_b64encode(new_key).decode('utf-8'))
-            return new_key
-
     def load_accounts(self):
         if not os.path.exists(DATA_FILE):
             return []
@@ -59,29 +46,68 @@ class AccountManager:
             if not encrypted_data:
                 return []
 
-            decrypted_data = self.cipher.decrypt(encrypted_data)
-            return json.loads(decrypted_data.decode('utf-8'))
+            decrypted_data = self.session.decrypt(encrypted_data)
+            accounts = json.loads(decrypted_data.decode('utf-8'))
         except Exception as e:
             print(f"Error loading accounts: {e}")
+            self._set_aside_unreadable(e)
             return []
 
+        # Older files kept passwords as plain text inside the encrypted store.
+        # Encrypt them individually so they are only decrypted when needed.
+        migrated = False
+        for acc in accounts:
+            # Accounts saved before multi-provider support are all WE
+            acc.setdefault("provider", DEFAULT_PROVIDER)
+            if "password" in acc:
+                acc["password_enc"] = self.session.encrypt_text(acc.pop("password"))
+                migrated = True
+        if migrated:
+            self.accounts = accounts
+            self.save_accounts()
+        return accounts
+
+    def _set_aside_unreadable(self, error):
+        """
+        Move an accounts file we can't decrypt (e.g. the keyring key was lost) out of the way,
+        so new accounts can be saved without overwriting it.
+        """
+        reason = str(error) or type(error).__name__  # Fernet's InvalidToken has no message
+        backup = f"{DATA_FILE}.unreadable-{time.strftime('%Y%m%d-%H%M%S')}"
+        try:
+            os.replace(DATA_FILE, backup)
+        except OSError as e:
+            print(f"Failed to move unreadable accounts file: {e}")
+            # Saving now would overwrite the accounts we couldn't read
+            self._load_failed = True
+            self.load_error = (f"Saved accounts could not be loaded ({reason}) and {DATA_FILE} could not be "
+                               f"moved aside. Changes won't be saved until it is moved or deleted.")
+            return
+        print(f"Moved unreadable accounts file to {backup}")
+        self.load_error = (f"Saved accounts could not be loaded ({reason}). The old file was kept as {backup}; "
+                           f"new accounts will be saved to a fresh file.")
+
     def save_accounts(self):
+        if self._load_failed:
+            print(f"Not saving accounts: {DATA_FILE} could not be loaded and would be overwritten")
+            return
         try:
             json_data = json.dumps(self.accounts).encode('utf-8')
-            encrypted_data = self.cipher.encrypt(json_data)
+            encrypted_data = self.session.encrypt(json_data)
             
             with open(DATA_FILE, "wb") as f:
                 f.write(encrypted_data)
         except Exception as e:
             print(f"Error saving accounts: {e}")
 
-    def add_account(self, name, number, password, service_type="Internet"):
+    def add_account(self, name, number, password, service_type="Internet", provider=DEFAULT_PROVIDER):
         new_account = {
             "id": self._generate_id(),
             "name": name,
             "number": number,
-            "password": password,
-            "service_type": service_type
+            "password_enc": self.session.encrypt_text(password),
+            "service_type": service_type,
+            "provider": provider
         }
         self.accounts.append(new_account)
         self.save_accounts()
@@ -95,7 +121,9 @@ class AccountManager:
         for acc in self.accounts:
             if acc["id"] == account_id:
                 for k, v in kwargs.items():
-                    if k in acc:
+                    if k == "password":
+                        acc["password_enc"] = self.session.encrypt_text(v)
+                    elif k in acc:
                         acc[k] = v
                 self.save_accounts()
                 return True
@@ -104,6 +132,16 @@ class AccountManager:
     def get_accounts(self):
         return self.accounts
 
+    def get_account(self, account_id):
+        for acc in self.accounts:
+            if acc["id"] == account_id:
+                return acc
+        return None
+
+    def get_password(self, account):
+        """Decrypt the password of a single account on demand"""
+        return self.session.decrypt_text(account["password_enc"])
+
     def _generate_id(self):
         import uuid
         return str(uuid.uuid4())
@@ -0,0 +1,67 @@
+"""
+Benchmark for usage_analytics on synthetic readings.
+
+    python bench_analytics.py --accounts 2000 --readings 1000
+"""
+import argparse
+import time
+
+import numpy as np
+
+import usage_analytics
+from usage_analytics import make_columns
+
+DAY = usage_analytics.DAY
+
+
+def synthetic_readings(n_accounts, readings_per_account, seed=0):
+    """Hourly-ish checks over a few months; quotas drain at random rates and renew when empty"""
+    rng = np.random.default_rng(seed)
+    n = n_accounts * readings_per_account
+    ids = np.repeat(np.array([f"acc-{i:05d}" for i in range(n_accounts)]), readings_per_account)
+
+    gaps = rng.exponential(3600.0, size=(n_accounts, readings_per_account))
+    checked_at = 1.7e9 + np.cumsum(gaps, axis=1)
+
+    rate = rng.gamma(2.0, 2.0, size=(n_accounts, 1)) / DAY  # GB per second
+    used = gaps * rate * rng.lognormal(0.0, 0.5, size=gaps.shape)
+    bundle = 140.0
+    remaining = bundle - np.cumsum(used, axis=1) % bundle
+
+    # Shuffle so make_columns has to sort, like rows coming from several sources
+    order = rng.permutation(n)
+    return ids[order], checked_at.ravel()[order], remaining.ravel()[order]
+
+
+def timed(label, func, n):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<20} {elapsed * 1000:9.1f} ms  {n / elapsed / 1e6:7.2f} M readings/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=2000)
+    parser.add_argument("--readings", type=int, default=1000, help="readings per account")
+    args = parser.parse_args()
+
+    n = args.accounts * args.readings
+    print(f"Generating {n:,} readings for {args.accounts:,} accounts...")
+    ids, checked_at, remaining = synthetic_readings(args.accounts, args.readings)
+    now = checked_at.max()
+
+    columns = timed("make_columns", lambda: make_columns(ids, checked_at, remaining), n)
+    timed("rolling_rate", lambda: usage_analytics.rolling_rate(columns), n)
+    stats = timed("account_stats", lambda: usage_analytics.account_stats(columns, now=now), n)
+    timed("daily_consumption", lambda: usage_analytics.daily_consumption(columns, utc_offset=0), n)
+    flagged = timed("anomalies", lambda: usage_analytics.anomalies(columns), n)
+    timed("summarize", lambda: usage_analytics.summarize(columns, now=now), n)
+
+    print(f"Top consumers this week: {usage_analytics.top_consumers(columns, stats, 3)}")
+    print(f"Anomalous intervals: {len(flagged['rate']):,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,49 @@
 import PyInstaller.__main__
-import customtkinter
+import argparse
 import os
 import sys
 from PIL import Image
 
+# Usage:
+#   python build_exe.py                       GUI bundle, as before
+#   python build_exe.py --lean --target all   lean GUI and CLI bundles
+#
+# Time the result with:  dist/EgyptISPQuota/EgyptISPQuota.exe --profile-startup=startup.json --startup-budget-ms=2000
+
+parser = argparse.ArgumentParser(description="Build the Egypt ISP Quota executables")
+parser.add_argument("--target", choices=["gui", "cli", "all"], default="gui",
+                    help="gui: windowed app, cli: headless console app, all: both as separate bundles")
+parser.add_argument("--lean", action="store_true",
+                    help="leave out modules the app never uses and only ship customtkinter's assets")
+options = parser.parse_args()
+
+# Modules that get pulled in by hooks or optional imports but are never used at runtime
+LEAN_EXCLUDES = [
+    'numpy.f2py',
+    'numpy.distutils',
+    'lib2to3',
+    'pydoc_data',
+    'xmlrpc',
+    'setuptools',
+    'pip',
+    'pytest',
+    'IPython',
+    'matplotlib',
+    'pandas',
+    'scipy',
+]
+
+# The CLI never opens a window
+CLI_EXCLUDES = [
+    'tkinter',
+    'customtkinter',
+    'darkdetect',
+    'PIL',
+]
+
+# Providers are imported by name at runtime, so PyInstaller can't see them
+HIDDEN_IMPORTS = ['providers.we']
+
 # 1. Prepare Icon
 icon_file = 'app_icon.ico'
 png_file = 'app_icon.png'
@@ -24,26 +64,61 @@ if not os.path.exists(icon_file):
 else:
     print(f"Using existing {icon_file}")
 
-# 2. Get customtkinter path
-ctk_path = os.path.dirname(customtkinter.__file__)
-print(f"CustomTkinter path found: {ctk_path}")
-
 # Determine separator for add-data based on OS
 separator = ';' if os.name == 'nt' else ':'
 
+
+def gui_args():
+    import customtkinter
+
+    # 2. Get customtkinter path
+    ctk_path = os.path.dirname(customtkinter.__file__)
+    print(f"CustomTkinter path found: {ctk_path}")
+
+    args = [
+        'main_ui.py',
+        '--name=EgyptISPQuota',
+        '--onedir',
+        '--noconsole',
+    ]
+    if options.lean:
+        # The Python files are collected as modules anyway; only the themes/fonts/icons are data
+        args.append(f'--add-data={os.path.join(ctk_path, "assets")}{separator}customtkinter/assets/')
+    else:
+        args.append(f'--add-data={ctk_path}{separator}customtkinter/')
+    return args
+
+
+def cli_args():
+    args = [
+        'cli.py',
+        '--name=EgyptISPQuotaCLI',
+        '--onedir',
+        '--console',
+    ]
+    args += [f'--exclude-module={module}' for module in CLI_EXCLUDES]
+    return args
+
+
 # 3. Build Arguments
-args = [
-    'main_ui.py',
-    '--name=EgyptISPQuota',
-    '--onedir',
-    '--noconsole',
-    f'--add-data={ctk_path}{separator}customtkinter/',
-    '--clean',
-]
+builds = []
+if options.target in ("gui", "all"):
+    builds.append(gui_args())
+if options.target in ("cli", "all"):
+    builds.append(cli_args())
+
+for args in builds:
+    args += [f'--hidden-import={module}' for module in HIDDEN_IMPORTS]
+    args.append('--clean')
+    if options.lean:
+        args += [f'--exclude-module={module}' for module in LEAN_EXCLUDES]
+        # Compressed binaries have to be unpacked on every launch
+        args.append('--noupx')
+
+    if icon_file:
+        args.append(f'--icon={icon_file}')
 
-if icon_file:
-    args.append(f'--icon={icon_file}')
+    print(f"Starting build process for {args[0]}...")
+    PyInstaller.__main__.run(args)
 
-print("Starting build process...")
-PyInstaller.__main__.run(args)
 print("Build complete! check the 'dist' folder.")
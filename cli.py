@@ -0,0 +1,189 @@
+import startup_profile
+
+# Started before the other imports so they show up in the profile (--profile-startup)
+profiler = startup_profile.from_argv()
+
+import argparse
+import multiprocessing
+import sys
+
+from account_manager import AccountManager
+
+
+def _find_account(account_manager, key):
+    """Look an account up by id, name or service number"""
+    for acc in account_manager.get_accounts():
+        if key in (acc["id"], acc["name"], acc["number"]):
+            return acc
+    return None
+
+
+def cmd_list(args):
+    account_manager = AccountManager()
+    for acc in account_manager.get_accounts():
+        print(f"{acc['name']}\t{acc['provider']}\t{acc['number']}\t{acc['service_type']}\t{acc['id']}")
+    return 0
+
+
+def cmd_check(args):
+    from quota_manager import QuotaManager
+    from quota_errors import QuotaError
+
+    account_manager = AccountManager()
+    acc = _find_account(account_manager, args.account)
+    if acc is None:
+        print(f"No account matches '{args.account}'", file=sys.stderr)
+        return 1
+
+    quota_manager = QuotaManager()
+    try:
+        quota = quota_manager.get_quota(
+            acc["number"],
+            account_manager.get_password(acc),
+            service_type=acc["service_type"],
+            debug_mode=args.debug,
+            provider=acc["provider"]
+        )
+    except QuotaError as e:
+        print(f"{acc['name']}: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        quota_manager.close()
+
+    print(f"{acc['name']}: {quota}")
+    _record_usage(acc["id"], quota)
+    return 0
+
+
+def _record_usage(account_id, quota):
+    from usage_history import UsageHistory
+
+    try:
+        UsageHistory().record(account_id, quota)
+    except Exception as e:
+        print(f"[DEBUG] Failed to record usage: {e}", file=sys.stderr)
+
+
+def cmd_sweep(args):
+    from sweep import SweepSupervisor
+
+    account_manager = AccountManager()
+    accounts = account_manager.get_accounts()
+    if args.accounts:
+        accounts = [_find_account(account_manager, key) for key in args.accounts]
+        missing = [key for key, acc in zip(args.accounts, accounts) if acc is None]
+        if missing:
+            print(f"No account matches: {', '.join(missing)}", file=sys.stderr)
+            return 1
+    names = {acc["id"]: acc["name"] for acc in accounts}
+
+    def on_result(account_id, result):
+        if result["status"] == "ok":
+            print(f"{names[account_id]}: {result['value']} ({result['elapsed']:.1f}s)")
+            _record_usage(account_id, result["value"])
+        else:
+            print(f"{names[account_id]}: {result['status']}: {result['value']}", file=sys.stderr)
+
+    supervisor = SweepSupervisor(
+        account_manager,
+        workers=args.workers,
+        deadline=args.deadline,
+        max_reassign=args.max_reassign,
+        debug_mode=args.debug
+    )
+    results = supervisor.run(list(names), on_result=on_result)
+    failed = sum(1 for r in results.values() if r["status"] != "ok")
+    return 1 if failed else 0
+
+
+def cmd_stats(args):
+    from usage_history import UsageHistory
+    import usage_analytics
+
+    account_manager = AccountManager()
+    names = {acc["id"]: acc["name"] for acc in account_manager.get_accounts()}
+    columns = UsageHistory().load_columns(list(names))
+    if not columns["account_ids"]:
+        print("No usage recorded yet. Run a check first.")
+        return 0
+
+    stats = usage_analytics.account_stats(columns, window_days=args.window)
+    summary = usage_analytics.summarize(columns, stats=stats)
+    print(f"{'Account':<20} {'Remaining':>10} {'GB/day':>8} {'Days left':>10} {f'Last {args.window:g}d':>10} {'Anomalies':>10}")
+    for account_id, s in summary.items():
+        days_left = "-" if s["days_left"] != s["days_left"] else f"{s['days_left']:.1f}"
+        rate = "-" if s["daily_rate"] != s["daily_rate"] else f"{s['daily_rate']:.2f}"
+        print(f"{names[account_id]:<20} {s['remaining']:>10.2f} {rate:>8} {days_left:>10} "
+              f"{s['window_consumed']:>10.2f} {s['anomalies']:>10}")
+
+    print()
+    print(f"Top consumers (last {args.window:g} days):")
+    for account_id, consumed in usage_analytics.top_consumers(columns, stats, args.top):
+        print(f"  {names[account_id]}: {consumed:.2f} GB")
+
+    if args.daily:
+        _print_daily(columns, names, args.daily)
+    return 0
+
+
+def _print_daily(columns, names, days):
+    import datetime
+    import usage_analytics
+
+    daily = usage_analytics.daily_consumption(columns)
+    if len(daily["day"]) == 0:
+        return
+    # Days are counted from 1970-01-01 in local time; the last `days` days end today
+    recent = daily["day"] > usage_analytics.local_day() - days
+    epoch = datetime.date(1970, 1, 1)
+
+    print()
+    print(f"Daily consumption (last {days} days, GB):")
+    for code, day, consumed in zip(daily["account"][recent], daily["day"][recent], daily["consumed"][recent]):
+        date = epoch + datetime.timedelta(days=int(day))
+        print(f"  {names[columns['account_ids'][code]]:<20} {date.isoformat()} {consumed:>8.2f}")
+
+
+def build_parser():
+    from sweep import DEFAULT_WORKERS, DEFAULT_DEADLINE, DEFAULT_MAX_REASSIGN
+
+    parser = argparse.ArgumentParser(prog="EgyptISPQuotaCLI", description="Check ISP quotas from the command line")
+    parser.add_argument("--debug", action="store_true", help="show the browser window")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list", help="list saved accounts")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("check", help="check one account")
+    p.add_argument("account", help="account id, name or service number")
+    p.set_defaults(func=cmd_check)
+
+    p = sub.add_parser("sweep", help="check many accounts in isolated worker processes")
+    p.add_argument("accounts", nargs="*", help="accounts to check (default: all)")
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="parallel browsers")
+    p.add_argument("--deadline", type=float, default=DEFAULT_DEADLINE, help="seconds before a worker is killed")
+    p.add_argument("--max-reassign", type=int, default=DEFAULT_MAX_REASSIGN,
+                   help="times an account is retried on a fresh worker")
+    p.set_defaults(func=cmd_sweep)
+
+    p = sub.add_parser("stats", help="usage statistics from past checks")
+    p.add_argument("--window", type=float, default=7, help="days used for rates and top consumers")
+    p.add_argument("--top", type=int, default=5, help="number of top consumers to show")
+    p.add_argument("--daily", type=int, nargs="?", const=7, default=0, metavar="DAYS",
+                   help="also show GB used per account per day (last 7 days by default)")
+    p.set_defaults(func=cmd_stats)
+
+    return parser
+
+
+def main(argv=None):
+    with profiler.phase("parse arguments"):
+        args = build_parser().parse_args(argv)
+    # Startup ends where the command begins
+    profiler.report()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
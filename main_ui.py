@@ -1,8 +1,14 @@
+import startup_profile
+
+# Started before the other imports so they show up in the profile (--profile-startup)
+profiler = startup_profile.from_argv()
+
 import customtkinter as ctk
 import threading
 from tkinter import messagebox
 from account_manager import AccountManager
 from quota_manager import QuotaManager
+from providers import DEFAULT_PROVIDER, available_providers, get_provider, provider_display_name
 
 # --- Configuration ---
 ctk.set_appearance_mode("Dark")  # Modes: "System" (standard), "Dark", "Light"
@@ -13,7 +19,8 @@ class App(ctk.CTk):
         super().__init__()
 
         # Managers
-        self.account_manager = AccountManager()
+        with profiler.phase("AccountManager (keyring + accounts)"):
+            self.account_manager = AccountManager()
         # QuotaManager will be instantiated per check or re-used. 
         # Modifying QuotaManager to accept headless param dynamically is better, 
         # but for now we can rely on passing it in get_quota or re-init.
@@ -22,6 +29,7 @@ class App(ctk.CTk):
         self.current_account = None
         self.check_thread = None
         self.stop_check = False  # Flag to signal stopping the check
+        self.check_id = 0  # Bumped per check, so a stopped check's thread can tell it is stale
 
         # Window Setup
         self.title("Egypt ISP Quota Checker")
@@ -74,6 +82,9 @@ class App(ctk.CTk):
         else:
             self.show_add_account_view()
 
+        if self.account_manager.load_error:
+            self.after_idle(lambda: messagebox.showwarning("Accounts", self.account_manager.load_error))
+
     def refresh_account_list(self):
         # Clear existing buttons
         for widget in self.accounts_list_frame.winfo_children():
@@ -133,9 +144,22 @@ class App(ctk.CTk):
         show_pass_btn = ctk.CTkButton(pass_frame, text="Show", width=60, command=toggle_password)
         show_pass_btn.pack(side="right", padx=(10, 0))
 
+        ctk.CTkLabel(entry_frame, text="Provider").pack(anchor="w", padx=10, pady=(10,0))
+        providers_by_label = {provider_display_name(p): p for p in available_providers()}
+        provider_var = ctk.StringVar(value=provider_display_name(DEFAULT_PROVIDER))
+
+        def provider_changed(label):
+            # Each provider offers its own service types
+            service_types = get_provider(providers_by_label[label]).service_types
+            type_menu.configure(values=service_types)
+            type_var.set(service_types[0])
+
+        provider_menu = ctk.CTkOptionMenu(entry_frame, variable=provider_var, values=list(providers_by_label), command=provider_changed)
+        provider_menu.pack(fill="x", padx=10, pady=5)
+
         ctk.CTkLabel(entry_frame, text="Service Type").pack(anchor="w", padx=10, pady=(10,0))
         type_var = ctk.StringVar(value="Internet")
-        type_menu = ctk.CTkOptionMenu(entry_frame, variable=type_var, values=["Internet", "4G"])
+        type_menu = ctk.CTkOptionMenu(entry_frame, variable=type_var, values=get_provider(DEFAULT_PROVIDER).service_types)
         type_menu.pack(fill="x", padx=10, pady=5)
 
         def save():
@@ -143,11 +167,12 @@ class App(ctk.CTk):
             number = num_entry.get()
             password = pass_entry.get()
             svc_type = type_var.get()
+            provider = providers_by_label[provider_var.get()]
 
             if not name or not number or not password:
                 return
 
-            self.account_manager.add_account(name, number, password, svc_type)
+            self.account_manager.add_account(name, number, password, svc_type, provider)
             self.refresh_account_list()
             # Select the newly created account
             new_acc = self.account_manager.get_accounts()[-1]
@@ -171,7 +196,10 @@ class App(ctk.CTk):
         ctk.CTkLabel(header, text=account['name'], font=ctk.CTkFont(size=32, weight="bold")).pack(side="left")
         
         def delete():
+            from usage_history import UsageHistory
+
             self.account_manager.delete_account(account['id'])
+            UsageHistory().delete_account(account['id'])
             self.refresh_account_list()
             accounts = self.account_manager.get_accounts()
             if accounts:
@@ -207,6 +235,17 @@ class App(ctk.CTk):
         
         ctk.CTkLabel(info_frame, text=f"Number: {account['number']}").pack(anchor="w", padx=10, pady=5)
         ctk.CTkLabel(info_frame, text=f"Service Type: {account['service_type']}").pack(anchor="w", padx=10, pady=5)
+        ctk.CTkLabel(info_frame, text=f"Provider: {provider_display_name(account['provider'])}").pack(anchor="w", padx=10, pady=5)
+        self.usage_label = ctk.CTkLabel(info_frame, text="")
+        self.usage_label.pack(anchor="w", padx=10, pady=5)
+        # Filled in once the window is drawn, the history and numpy load lazily
+        usage_label = self.usage_label
+
+        def show_usage():
+            if usage_label.winfo_exists():
+                usage_label.configure(text=self._usage_text(account['id']))
+
+        self.after_idle(show_usage)
 
 
     def start_quota_check(self):
@@ -214,12 +253,13 @@ class App(ctk.CTk):
             return
         
         self.stop_check = False  # Reset stop flag
+        self.check_id += 1
         self.check_btn.configure(state="disabled", text="Checking...")
         self.stop_btn.pack(side="right", padx=(10, 0))  # Show stop button
         self.status_label.configure(text="Logging in... (This takes a few seconds)", text_color="yellow")
         
         # Run in thread to not freeze UI
-        self.check_thread = threading.Thread(target=self._run_check_quota)
+        self.check_thread = threading.Thread(target=self._run_check_quota, args=(self.check_id,))
         self.check_thread.start()
 
     def stop_quota_check(self):
@@ -228,49 +268,89 @@ class App(ctk.CTk):
         self.status_label.configure(text="Stopping...", text_color="orange")
         
         # Force close the browser if running
-        if self.quota_manager.driver:
-            try:
-                self.quota_manager.driver.quit()
-            except:
-                pass
-            self.quota_manager.driver = None
+        self.quota_manager.cancel()
         
         self._reset_check_ui("Check stopped by user")
 
-    def _run_check_quota(self):
+    def _is_stale(self, check_id):
+        """True once the check was stopped, even if a newer check has started since"""
+        return self.stop_check or check_id != self.check_id
+
+    def _run_check_quota(self, check_id):
         try:
             # Get verify SSL setting
             # debug_mode = self.debug_mode.get() == 1
             # For now force debug mode if desired, or read from switch
             is_debug = bool(self.debug_mode.get())
             
+            account_id = self.current_account["id"]
             username = self.current_account["number"] # Changed from "username" to "number" based on existing code
-            password = self.current_account["password"]
+            password = self.account_manager.get_password(self.current_account)
             
-            # Pass stop_check check to manager? 
-            # Ideally manager checks it, but for now we just kill driver on stop.
+            # Stopping is handled by QuotaManager.cancel(), which kills the driver
+            # and keeps the retry policy from starting a new one.
             
             quota = self.quota_manager.get_quota(
                 username, 
                 password, 
                 service_type=self.current_account['service_type'], # Use actual service type from account
-                debug_mode=is_debug
+                debug_mode=is_debug,
+                on_retry=lambda *args: self._on_check_retry(check_id, *args),
+                provider=self.current_account['provider']
             )
             
-            if self.stop_check:
+            if self._is_stale(check_id):
                 return # Check was stopped
+
+            usage_text = self._record_usage(account_id, quota)
                 
             # Update UI on main thread
-            self.after(0, lambda: self._update_quota_success(quota))
+            self.after(0, lambda: self._update_quota_success(quota, usage_text))
             
         except Exception as e:
-            if self.stop_check:
+            if self._is_stale(check_id):
                 return
             err_msg = str(e)
             self.after(0, lambda: self._update_quota_error(err_msg))
 
-    def _update_quota_success(self, quota):
+    def _on_check_retry(self, check_id, attempt, error, delay):
+        """Called from the check thread before QuotaManager retries a transient failure"""
+        if self._is_stale(check_id):
+            return
+        text = f"{error} Retrying in {delay:.0f}s..."
+        self.after(0, lambda: self.status_label.configure(text=text, text_color="orange"))
+
+    def _record_usage(self, account_id, quota):
+        """Save the reading to the usage history and return the updated usage summary text"""
+        from usage_history import UsageHistory
+
+        try:
+            UsageHistory().record(account_id, quota)
+        except Exception as e:
+            print(f"[DEBUG] Failed to record usage: {e}")
+        return self._usage_text(account_id)
+
+    def _usage_text(self, account_id):
+        from usage_history import UsageHistory
+        from usage_analytics import summarize
+
+        try:
+            summary = summarize(UsageHistory().load_columns([account_id])).get(account_id)
+        except Exception as e:
+            print(f"[DEBUG] Failed to load usage history: {e}")
+            return ""
+        if not summary or summary["daily_rate"] != summary["daily_rate"]:  # NaN: not enough readings yet
+            return "Usage: check again later to see your daily usage"
+
+        text = f"Usage: {summary['daily_rate']:.2f} GB/day, {summary['window_consumed']:.2f} GB this week"
+        if summary["days_left"] != float("inf"):
+            text += f" (~{summary['days_left']:.0f} days left)"
+        return text
+
+    def _update_quota_success(self, quota, usage_text=""):
         self.quota_display.configure(text=f"{quota}")
+        if usage_text:
+            self.usage_label.configure(text=usage_text)
         self.status_label.configure(text="Updated just now", text_color="green")
         self._reset_check_ui()
 
@@ -292,14 +372,14 @@ class App(ctk.CTk):
         """Clean up browser and close app"""
         print("[DEBUG] App closing, cleaning up...")
         if self.quota_manager.driver:
-            try:
-                self.quota_manager.driver.quit()
-                print("[DEBUG] Browser closed successfully")
-            except:
-                pass
+            self.quota_manager.close()
+            print("[DEBUG] Browser closed successfully")
         self.destroy()
 
 
 if __name__ == "__main__":
-    app = App()
+    with profiler.phase("App window"):
+        app = App()
+    # Runs once the first frame is drawn
+    app.after_idle(profiler.report)
     app.mainloop()
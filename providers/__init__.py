@@ -0,0 +1,48 @@
+"""
+ISP provider plugins.
+
+Providers are registered by name as "module:Class" strings and only imported the first
+time an account of that provider is checked, so unused providers cost nothing at startup.
+The name is what AccountManager stores in each account's "provider" field.
+"""
+import importlib
+
+DEFAULT_PROVIDER = "we"
+
+# name -> {"target": "module:Class", "display_name": str}
+_REGISTRY = {}
+_instances = {}
+
+
+def register_provider(name, target, display_name=None):
+    """Register a provider class given as a "module:Class" string (or the class itself)"""
+    _REGISTRY[name] = {"target": target, "display_name": display_name or name}
+    _instances.pop(name, None)
+
+
+def available_providers():
+    """Registered provider names, without importing any of them"""
+    return list(_REGISTRY)
+
+
+def provider_display_name(name):
+    return _REGISTRY[name]["display_name"]
+
+
+def get_provider(name=None):
+    """Return the (shared) instance of a provider, importing it on first use"""
+    name = name or DEFAULT_PROVIDER
+    if name in _instances:
+        return _instances[name]
+    if name not in _REGISTRY:
+        raise KeyError(f"Unknown provider: {name}")
+
+    target = _REGISTRY[name]["target"]
+    if isinstance(target, str):
+        module_name, class_name = target.split(":")
+        target = getattr(importlib.import_module(module_name), class_name)
+    _instances[name] = target()
+    return _instances[name]
+
+
+register_provider("we", "providers.we:WEProvider", display_name="WE (Telecom Egypt)")
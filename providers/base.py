@@ -0,0 +1,69 @@
+import time
+from abc import ABC, abstractmethod
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import UnexpectedAlertPresentException
+
+
+class Provider(ABC):
+    """
+    Base class for an ISP portal.
+
+    QuotaManager drives every provider through the same pipeline: it opens `login_url`,
+    calls `login()`, then `read_quota()`, and takes care of the browser, retries and timing.
+    Providers only describe their own pages. Selenium errors can be left to propagate;
+    raise AuthError/PortalChangedError from quota_errors for failures Selenium can't see.
+
+    The display name is given to register_provider(), so the UI can list providers
+    without importing them.
+    """
+    name = None
+    login_url = None
+    service_types = ["Internet"]  # Choices offered when adding an account
+
+    def detect_account_type(self, number, service_type):
+        """
+        The account type passed to the login and quota steps, for portals that treat some
+        lines differently from what the saved service type says (defaults to the service type)
+        """
+        return service_type
+
+    def wait_for_page(self, driver):
+        """Wait until the login page is usable after navigating to `login_url`"""
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located((By.TAG_NAME, "body"))
+        )
+
+    @abstractmethod
+    def login(self, driver, number, password, service_type, account_type):
+        """Fill in and submit the login form, returning once the dashboard starts loading"""
+
+    @abstractmethod
+    def read_quota(self, driver, account_type):
+        """Read the remaining quota from the dashboard, returned as e.g. "12.34 GB" """
+
+    # --- Helpers shared by providers ---
+
+    def handle_alert(self, driver):
+        try:
+            alert = driver.switch_to.alert
+            print(f"[DEBUG] Alert detected: {alert.text}, dismissing...")
+            alert.accept()
+            time.sleep(0.5)
+            return True
+        except:
+            return False
+
+    def safe_click(self, driver, element):
+        from selenium.webdriver.common.action_chains import ActionChains
+
+        try:
+            element.click()
+        except UnexpectedAlertPresentException:
+            self.handle_alert(driver)
+            # Retry click
+            element.click()
+        except Exception:
+            # Fallback
+            ActionChains(driver).move_to_element(element).click().perform()
@@ -0,0 +1,180 @@
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+from providers.base import Provider
+from quota_errors import AuthError, PortalChangedError
+
+
+# Account types from detect_account_type()
+ACCOUNT_4G = "4G"
+ACCOUNT_LANDLINE = "landline"
+
+
+class WEProvider(Provider):
+    """WE (Telecom Egypt) - my.te.eg"""
+    name = "we"
+    login_url = "https://my.te.eg/user/login"
+    service_types = ["Internet", "4G"]
+
+    def detect_account_type(self, number, service_type):
+        # Only the number decides: 4G lines (starting with 015) have no service type dropdown
+        # and show an FLTE quota. Anything else uses the dropdown with the saved service type.
+        if number.startswith("015"):
+            return ACCOUNT_4G
+        return ACCOUNT_LANDLINE
+
+    def login(self, driver, number, password, service_type, account_type):
+        # 1. Username
+        print("[DEBUG] Looking for username field...")
+        try:
+            user_input = WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.XPATH, '//input[@type="text" or @id="etisalat-input"]'))
+            )
+        except TimeoutException:
+            user_input = WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/section/main/div/div/div/div[2]/div/div[2]/div/div[1]/div/form/div/div/div/div/div/div[1]/input'))
+            )
+
+        user_input.clear()
+        user_input.send_keys(number)
+        print("[DEBUG] Username entered")
+
+        # 2. Password
+        print("[DEBUG] Looking for password field...")
+        try:
+            pass_input = WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located((By.XPATH, '//input[@type="password"]'))
+            )
+        except TimeoutException:
+            pass_input = WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/section/main/div/div/div/div[2]/div/div[2]/div/div[2]/form/div/div/div/div/input'))
+            )
+        pass_input.clear()
+        pass_input.send_keys(password)
+        print("[DEBUG] Password entered")
+
+        # 3. Service Type Selection (skip for 4G)
+        if account_type == ACCOUNT_4G:
+            print("[DEBUG] 4G account detected, skipping service type selection")
+        else:
+            print(f"[DEBUG] Selecting service type: {service_type}")
+            # Wait for dropdown to be clickable
+            service_dropdown = WebDriverWait(driver, 10).until(
+                EC.element_to_be_clickable((By.CLASS_NAME, "ant-select-selector"))
+            )
+
+            # Check for alert before interacting
+            self.handle_alert(driver)
+
+            # Click dropdown safely
+            self.safe_click(driver, service_dropdown)
+
+            time.sleep(1.5)  # Wait for dropdown animation
+            print("[DEBUG] Dropdown clicked, looking for options...")
+
+            # Check for alert again
+            self.handle_alert(driver)
+
+            # Wait for dropdown options to appear and be visible
+            # If service selection fails, the login button won't work
+            option = WebDriverWait(driver, 10).until(
+                EC.visibility_of_element_located((By.XPATH, f"//div[contains(@class, 'ant-select-item-option-content')]//span[contains(text(), '{service_type}')]"))
+            )
+
+            print(f"[DEBUG] Found option: {option.text}")
+
+            # Click option safely
+            self.safe_click(driver, option)
+
+            time.sleep(1)
+            print("[DEBUG] Service type selected successfully")
+
+        # 4. Login Button
+        print("[DEBUG] Clicking login button...")
+        login_btn = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.ID, "login-withecare"))
+        )
+        login_btn.click()
+        print("[DEBUG] Login button clicked, waiting for response...")
+
+        # 5. Check for Success or Error
+        result = WebDriverWait(driver, 30).until(
+            EC.any_of(
+                EC.presence_of_element_located((By.CLASS_NAME, "ant-progress-circle")),
+                EC.presence_of_element_located((By.CLASS_NAME, "ant-message-error"))
+            )
+        )
+
+        if "ant-message-error" in result.get_attribute("class"):
+            try:
+                err_text = result.text
+            except:
+                err_text = "Unknown login error"
+            raise AuthError(f"Login failed: {err_text}")
+
+        print("[DEBUG] Login successful, waiting for dashboard...")
+
+    def read_quota(self, driver, account_type):
+        # 6. Wait for Dashboard & Quota
+        WebDriverWait(driver, 20).until_not(
+            EC.presence_of_element_located((By.CLASS_NAME, "ant-spin-spinning"))
+        )
+
+        print("[DEBUG] Looking for quota value...")
+
+        if account_type == ACCOUNT_4G:
+            # 4G: Look for FLTE remaining value
+            print("[DEBUG] 4G account - looking for FLTE quota...")
+            # Wait for the usage overview section to load
+            time.sleep(2)
+
+            # Find the "Remaining" span and get the value before it
+            # The structure is: <span>VALUE</span><span> Remaining</span>
+            remaining_spans = driver.find_elements(By.XPATH,
+                "//span[contains(text(), 'Remaining')]"
+            )
+
+            quota_value = None
+            for remaining_span in remaining_spans:
+                parent = remaining_span.find_element(By.XPATH, "..")
+                spans = parent.find_elements(By.TAG_NAME, "span")
+                for span in spans:
+                    text = span.text.strip()
+                    # Look for numeric value (e.g., "31,876.02")
+                    if text and text.replace(",", "").replace(".", "").isdigit():
+                        quota_value = text
+                        break
+                if quota_value:
+                    break
+
+            if not quota_value:
+                # Fallback: try finding by style
+                remaining_elem = WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.XPATH,
+                        ".//span[contains(@style, 'font-size: 2.1875rem')]"
+                    ))
+                )
+                quota_value = remaining_elem.text
+
+            # Convert from MB to GB
+            try:
+                quota_mb = float(quota_value.replace(",", ""))
+            except ValueError:
+                raise PortalChangedError(f"Failed to extract 4G quota: unexpected value '{quota_value}'")
+            quota_gb = quota_mb / 1024
+            print(f"[DEBUG] FLTE Quota found: {quota_value} MB = {quota_gb:.2f} GB")
+            return f"{quota_gb:.2f} GB"
+        else:
+            # Regular Internet quota
+            remaining_elem = WebDriverWait(driver, 15).until(
+                EC.presence_of_element_located((By.XPATH,
+                    ".//span[contains(@style, 'font-size: 2.1875rem') and contains(@style, 'color: var(--ec-brand-primary)')]"
+                ))
+            )
+
+            quota_value = remaining_elem.text
+            print(f"[DEBUG] Quota found: {quota_value}")
+            return quota_value + " GB"
@@ -0,0 +1,36 @@
+class QuotaError(Exception):
+    """Base class for quota check failures.
+
+    `transient` tells the retry policy whether trying again can help,
+    `step` records which part of the check failed so a retry can resume there.
+    """
+    transient = False
+
+    def __init__(self, message, step=None):
+        super().__init__(message)
+        self.step = step
+
+
+class AuthError(QuotaError):
+    """The portal rejected the credentials (wrong number/password/service type)."""
+    transient = False
+
+
+class PortalChangedError(QuotaError):
+    """The page loaded but an expected element or value is missing or unreadable."""
+    transient = False
+
+
+class QuotaTimeoutError(QuotaError):
+    """The page or an element did not show up in time."""
+    transient = True
+
+
+class BrowserCrashError(QuotaError):
+    """The browser or geckodriver died or stopped responding."""
+    transient = True
+
+
+class CheckCancelled(QuotaError):
+    """The check was stopped by the user."""
+    transient = False
@@ -1,46 +1,95 @@
 import os
 import time
+import random
+import threading
 import traceback
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
 
-# Browser driver managers
-from webdriver_manager.firefox import GeckoDriverManager
+# Selenium and webdriver-manager are imported where they're used: they are slow to load
+# and the UI should be up before the first check needs them.
+from providers import get_provider
+from quota_errors import (
+    QuotaError,
+    AuthError,
+    PortalChangedError,
+    QuotaTimeoutError,
+    BrowserCrashError,
+    CheckCancelled,
+)
 
-from selenium.webdriver.firefox.service import Service as FirefoxService
+# Steps of a quota check, in order
+STEP_NAVIGATE = "navigate"
+STEP_LOGIN = "login"
+STEP_DASHBOARD = "dashboard"
+STEPS = (STEP_NAVIGATE, STEP_LOGIN, STEP_DASHBOARD)
+
+# Where to pick up again after a transient failure in a given step.
+# A half-filled login form can't be trusted, so login starts over from the page load;
+# the dashboard only needs a re-read since the session cookies are still valid.
+RESUME_FROM = {
+    STEP_NAVIGATE: STEP_NAVIGATE,
+    STEP_LOGIN: STEP_NAVIGATE,
+    STEP_DASHBOARD: STEP_DASHBOARD,
+}
+
+
+class RetryPolicy:
+    """Retries transient failures with exponential back-off and jitter."""
+
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=10.0, jitter=0.5):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def should_retry(self, error, attempt):
+        return error.transient and attempt < self.max_attempts
+
+    def delay(self, attempt):
+        """Back-off before the retry that follows `attempt` (1-based)"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(delay * (1 - self.jitter), delay)
 
 
 class QuotaManager:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, retry_policy=None):
         self.headless = headless
         self.driver = None
         self.driver_path = None  # Lazy-loaded on first use
         self._driver_path_cached = False
-    
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._cancel_event = None  # set by cancel(); a new Event for every get_quota call
+        self._driver_lock = threading.Lock()  # guards self.driver between a check and cancel()
+        self.last_timings = {}  # step -> seconds spent in the last get_quota call
+        self._timed_out_steps = set()  # steps that already hit an element timeout in this call
+
     def _ensure_driver_path(self):
         """Lazy-load the geckodriver path on first use"""
         if self._driver_path_cached:
             return
-        
+
         print("[DEBUG] Caching geckodriver path...")
         try:
+            # Browser driver managers
+            from webdriver_manager.firefox import GeckoDriverManager
+
             self.driver_path = GeckoDriverManager().install()
             print(f"[DEBUG] Geckodriver cached at: {self.driver_path}")
         except Exception as e:
             print(f"[DEBUG] webdriver-manager failed: {e}, will use local geckodriver")
             self.driver_path = None
-        
+
         self._driver_path_cached = True
 
     def _init_driver(self):
+        """Start a new Firefox and return it"""
+        from selenium import webdriver
+        from selenium.webdriver.firefox.service import Service as FirefoxService
+
         print(f"[DEBUG] Initializing Firefox browser, headless={self.headless}")
-        
+
         # Lazy-load the driver path on first use
         self._ensure_driver_path()
-        
+
         options = webdriver.FirefoxOptions()
         options.page_load_strategy = 'eager'
         if self.headless:
@@ -48,47 +97,70 @@ class QuotaManager:
             os.environ['MOZ_HEADLESS'] = '1'
         else:
             os.environ.pop('MOZ_HEADLESS', None)
-        
+
         try:
             if self.driver_path:
                 service = FirefoxService(self.driver_path)
-                self.driver = webdriver.Firefox(service=service, options=options)
+                driver = webdriver.Firefox(service=service, options=options)
             else:
-                self.driver = webdriver.Firefox(options=options)
+                driver = webdriver.Firefox(options=options)
         except Exception as e:
             print(f"[DEBUG] Failed to start Firefox: {e}, trying without cached path")
-            self.driver = webdriver.Firefox(options=options)
-        
+            driver = webdriver.Firefox(options=options)
+
         print(f"[DEBUG] Browser initialized successfully")
+        return driver
+
+    def _discard_driver(self):
+        """Quit the browser (if any) and forget it"""
+        with self._driver_lock:
+            driver, self.driver = self.driver, None
+        if driver:
+            try:
+                driver.quit()
+            except:
+                pass
+
+    def close(self):
+        """Shut down the browser"""
+        self._discard_driver()
+
+    def cancel(self):
+        """Stop an ongoing check from another thread. The check raises CheckCancelled."""
+        with self._driver_lock:
+            if self._cancel_event is not None:
+                self._cancel_event.set()
+        self._discard_driver()
 
-    def get_quota(self, username, password, service_type="Internet", debug_mode=False):
+    def get_quota(self, username, password, service_type="Internet", debug_mode=False, on_retry=None,
+                  provider=None):
         """
         Logs in and fetches the quota using Firefox.
         Always performs a fresh login to get accurate quota values.
+
+        `provider` is a registered provider name (see providers/), WE by default.
+        The portal-specific steps come from the provider; the browser, retries and
+        timings are handled here the same way for every provider.
+
+        Transient failures (timeouts, a crashed browser) are retried according to
+        `self.retry_policy`, resuming from the step that failed. `on_retry(attempt, error, delay)`
+        is called before each retry. Raises a QuotaError subclass on failure.
         """
+        # Each call gets its own token: a check that was stopped keeps seeing it set
+        # even after the next check has started
+        cancelled = threading.Event()
+        with self._driver_lock:
+            self._cancel_event = cancelled
         target_headless = not debug_mode
         print(f"[DEBUG] get_quota called: debug_mode={debug_mode}, headless={target_headless}")
-        
+
         # Check if we need to reinitialize the driver (headless mode changed)
-        need_new_driver = False
-        if self.driver is None:
-            need_new_driver = True
-        elif self.headless != target_headless:
+        if self.driver is not None and self.headless != target_headless:
             print("[DEBUG] Headless mode changed, reinitializing driver...")
-            need_new_driver = True
-            try:
-                self.driver.quit()
-            except:
-                pass
-            self.driver = None
-        
-        if need_new_driver:
-            self.headless = target_headless
-            try:
-                self._init_driver()
-            except Exception as e:
-                raise Exception(f"Failed to start browser: {str(e)}\n{traceback.format_exc()}")
-        else:
+            self._discard_driver()
+        self.headless = target_headless
+
+        if self.driver is not None:
             # Reusing existing driver - clear cookies for fresh login
             print("[DEBUG] Reusing existing browser, clearing session for fresh login...")
             try:
@@ -96,210 +168,148 @@ class QuotaManager:
             except:
                 pass
 
-
-        try:
-            print("[DEBUG] Navigating to login page...")
-            self.driver.get("https://my.te.eg/user/login")
-
-            # Wait for body to ensure page loaded
-            print("[DEBUG] Waiting for page content...")
-            WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            # Discuss body wait is fine
-            
-            # --- Login Steps ---
-            # 1. Username
-            print("[DEBUG] Looking for username field...")
+        provider = get_provider(provider)
+        account_type = provider.detect_account_type(username, service_type)
+        self.last_timings = {}
+        self._timed_out_steps = set()
+        step = STEP_NAVIGATE
+        attempt = 1
+        while True:
             try:
-                user_input = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, '//input[@type="text" or @id="etisalat-input"]'))
-                )
-            except:
-                user_input = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/section/main/div/div/div/div[2]/div/div[2]/div/div[1]/div/form/div/div/div/div/div/div[1]/input'))
-                )
-            
-            user_input.clear()
-            user_input.send_keys(username)
-            print("[DEBUG] Username entered")
-
-            # 2. Password
-            print("[DEBUG] Looking for password field...")
-            try:
-                pass_input = WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.XPATH, '//input[@type="password"]'))
-                )
-            except:
-                pass_input = WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.XPATH, '/html/body/div[1]/section/main/div/div/div/div[2]/div/div[2]/div/div[2]/form/div/div/div/div/input'))
-                )
-            pass_input.clear()
-            pass_input.send_keys(password)
-            print("[DEBUG] Password entered")
-
-            # 3. Service Type Selection (skip for 4G - numbers starting with 015)
-            is_4g = username.startswith("015")
-            
-            if is_4g:
-                print("[DEBUG] 4G account detected, skipping service type selection")
-            else:
-                print(f"[DEBUG] Selecting service type: {service_type}")
-                try:
-                    from selenium.webdriver.common.action_chains import ActionChains
-                    from selenium.common.exceptions import UnexpectedAlertPresentException, NoAlertPresentException
-                    
-                    def handle_alert():
-                        try:
-                            alert = self.driver.switch_to.alert
-                            print(f"[DEBUG] Alert detected: {alert.text}, dismissing...")
-                            alert.accept()
-                            time.sleep(0.5)
-                            return True
-                        except:
-                            return False
-
-                    def safe_click(element):
-                        try:
-                            element.click()
-                        except UnexpectedAlertPresentException:
-                            handle_alert()
-                            # Retry click
-                            element.click()
-                        except Exception:
-                            # Fallback
-                            ActionChains(self.driver).move_to_element(element).click().perform()
-
-                    # Wait for dropdown to be clickable
-                    service_dropdown = WebDriverWait(self.driver, 10).until(
-                        EC.element_to_be_clickable((By.CLASS_NAME, "ant-select-selector"))
-                    )
-                    
-                    # Check for alert before interacting
-                    handle_alert()
-                    
-                    # Click dropdown safely
-                    safe_click(service_dropdown)
-                    
-                    time.sleep(1.5)  # Wait for dropdown animation
-                    print("[DEBUG] Dropdown clicked, looking for options...")
-                    
-                    # Check for alert again
-                    handle_alert()
-
-                    target_service = "Internet" if service_type == "Internet" else service_type
-                    
-                    # Wait for dropdown options to appear and be visible
-                    option = WebDriverWait(self.driver, 10).until(
-                        EC.visibility_of_element_located((By.XPATH, f"//div[contains(@class, 'ant-select-item-option-content')]//span[contains(text(), '{target_service}')]"))
-                    )
-                    
-                    print(f"[DEBUG] Found option: {option.text}")
-                    
-                    # Click option safely
-                    safe_click(option)
-                    
-                    time.sleep(1)
-                    print("[DEBUG] Service type selected successfully")
-                except Exception as e:
-                    print(f"[DEBUG] Service selection failed: {e}")
-                    # If service selection fails, the login button won't work
-                    raise Exception(f"Failed to select service type: {e}")
-
-            # 4. Login Button
-            print("[DEBUG] Clicking login button...")
-            login_btn = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "login-withecare"))
-            )
-            login_btn.click()
-            print("[DEBUG] Login button clicked, waiting for response...")
-
-            # 5. Check for Success or Error
-            result = WebDriverWait(self.driver, 30).until(
-                EC.any_of(
-                    EC.presence_of_element_located((By.CLASS_NAME, "ant-progress-circle")),
-                    EC.presence_of_element_located((By.CLASS_NAME, "ant-message-error"))
-                )
-            )
-
-            if "ant-message-error" in result.get_attribute("class"):
-                try:
-                    err_text = result.text
-                except:
-                    err_text = "Unknown login error"
-                raise Exception(f"Login failed: {err_text}")
-
-            print("[DEBUG] Login successful, waiting for dashboard...")
-
-            # 6. Wait for Dashboard & Quota
-            WebDriverWait(self.driver, 20).until_not(
-                EC.presence_of_element_located((By.CLASS_NAME, "ant-spin-spinning"))
-            )
-
-            print("[DEBUG] Looking for quota value...")
-            
-            if is_4g:
-                # 4G: Look for FLTE remaining value
-                print("[DEBUG] 4G account - looking for FLTE quota...")
-                try:
-                    # Wait for the usage overview section to load
-                    time.sleep(2)
-                    
-                    # Find the "Remaining" span and get the value before it
-                    # The structure is: <span>VALUE</span><span> Remaining</span>
-                    remaining_spans = self.driver.find_elements(By.XPATH, 
-                        "//span[contains(text(), 'Remaining')]"
-                    )
-                    
-                    quota_value = None
-                    for remaining_span in remaining_spans:
-                        parent = remaining_span.find_element(By.XPATH, "..")
-                        spans = parent.find_elements(By.TAG_NAME, "span")
-                        for span in spans:
-                            text = span.text.strip()
-                            # Look for numeric value (e.g., "31,876.02")
-                            if text and text.replace(",", "").replace(".", "").isdigit():
-                                quota_value = text
-                                break
-                        if quota_value:
-                            break
-                    
-                    if not quota_value:
-                        # Fallback: try finding by style
-                        remaining_elem = WebDriverWait(self.driver, 10).until(
-                            EC.presence_of_element_located((By.XPATH, 
-                                ".//span[contains(@style, 'font-size: 2.1875rem')]"
-                            ))
-                        )
-                        quota_value = remaining_elem.text
-                    
-                    # Convert from MB to GB
-                    quota_mb = float(quota_value.replace(",", ""))
-                    quota_gb = quota_mb / 1024
-                    print(f"[DEBUG] FLTE Quota found: {quota_value} MB = {quota_gb:.2f} GB")
-                    return f"{quota_gb:.2f} GB"
-                    
-                except Exception as e:
-                    print(f"[DEBUG] 4G quota extraction failed: {e}")
-                    raise Exception(f"Failed to extract 4G quota: {e}")
+                return self._run_steps(step, provider, username, password, service_type, account_type, cancelled)
+            except QuotaError as e:
+                error = e
+
+            if cancelled.is_set():
+                # cancel() already closed the browser; self.driver may belong to a newer check by now
+                raise CheckCancelled("Check stopped by user", error.step)
+            if not self.retry_policy.should_retry(error, attempt):
+                if not isinstance(error, (AuthError, PortalChangedError, QuotaTimeoutError)):
+                    # Not the portal's doing: the browser itself may be unusable, start fresh next time
+                    self._discard_driver()
+                raise error
+
+            if isinstance(error, BrowserCrashError):
+                # A dead browser has no session to resume
+                self._discard_driver()
+                step = STEP_NAVIGATE
             else:
-                # Regular Internet quota
-                remaining_elem = WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.XPATH, 
-                        ".//span[contains(@style, 'font-size: 2.1875rem') and contains(@style, 'color: var(--ec-brand-primary)')]"
-                    ))
-                )
+                step = RESUME_FROM.get(error.step, STEP_NAVIGATE)
 
-                quota_value = remaining_elem.text
-                print(f"[DEBUG] Quota found: {quota_value}")
-                return quota_value + " GB"
+            delay = self.retry_policy.delay(attempt)
+            print(f"[DEBUG] {type(error).__name__} during {error.step}: {error}. "
+                  f"Retrying from {step} in {delay:.1f}s (attempt {attempt + 1}/{self.retry_policy.max_attempts})")
+            if on_retry:
+                on_retry(attempt, error, delay)
+            if cancelled.wait(delay):
+                raise CheckCancelled("Check stopped by user", error.step)
+            attempt += 1
 
+    def _run_steps(self, start_step, provider, username, password, service_type, account_type, cancelled):
+        """Run the check from `start_step` to the end, returning the quota string"""
+        steps = {
+            STEP_NAVIGATE: lambda: self._navigate(provider, cancelled),
+            STEP_LOGIN: lambda: provider.login(self.driver, username, password, service_type, account_type),
+            STEP_DASHBOARD: lambda: self._read_dashboard(provider, account_type, reload=start_step == STEP_DASHBOARD),
+        }
+        result = None
+        for step in STEPS[STEPS.index(start_step):]:
+            result = self._run_step(step, steps[step], cancelled)
+        return result
+
+    def _run_step(self, step, func, cancelled):
+        """Run one step, translating Selenium errors into QuotaError subclasses"""
+        from selenium.common.exceptions import (
+            TimeoutException,
+            WebDriverException,
+            NoSuchElementException,
+            StaleElementReferenceException,
+            UnexpectedAlertPresentException,
+            ElementClickInterceptedException,
+            ElementNotInteractableException,
+            InvalidElementStateException,
+            InvalidSelectorException,
+            MoveTargetOutOfBoundsException,
+            JavascriptException,
+            InvalidSessionIdException,
+            NoSuchWindowException,
+        )
+        from urllib3.exceptions import MaxRetryError, ProtocolError
+
+        if cancelled.is_set():
+            raise CheckCancelled("Check stopped by user", step)
+        started = time.perf_counter()
+        try:
+            return func()
+        except QuotaError as e:
+            if e.step is None:
+                e.step = step
+            raise
         except TimeoutException as e:
-            raise Exception(f"Timeout waiting for page element. The page might have changed or be slow to respond.\nDetails: {str(e)}")
+            # The login page loaded, yet the same step timed out again after a retry:
+            # the element isn't coming, so don't keep retrying
+            if step != STEP_NAVIGATE and step in self._timed_out_steps:
+                raise PortalChangedError(
+                    f"Expected page element still missing during {step} after a retry. The portal might have changed.", step
+                ) from e
+            self._timed_out_steps.add(step)
+            raise QuotaTimeoutError(
+                f"Timeout waiting for page element during {step}. The page might be slow to respond.", step
+            ) from e
+        except (UnexpectedAlertPresentException, StaleElementReferenceException,
+                ElementClickInterceptedException) as e:
+            # The page was still changing under us; worth another try
+            raise QuotaTimeoutError(f"Page was not ready during {step}: {e.msg}", step) from e
+        except (InvalidSessionIdException, NoSuchWindowException, MaxRetryError, ProtocolError, OSError) as e:
+            # The browser or geckodriver is gone (ConnectionError is an OSError)
+            if cancelled.is_set():
+                raise CheckCancelled("Check stopped by user", step) from e
+            raise BrowserCrashError(f"Browser stopped responding during {step}: {e}", step) from e
+        except (NoSuchElementException, ElementNotInteractableException, InvalidElementStateException,
+                InvalidSelectorException, MoveTargetOutOfBoundsException, JavascriptException) as e:
+            if cancelled.is_set():
+                raise CheckCancelled("Check stopped by user", step) from e
+            raise PortalChangedError(
+                f"Page elements did not behave as expected during {step}: {e.msg}. The portal might have changed.", step
+            ) from e
         except WebDriverException as e:
-            raise Exception(f"Browser error: {str(e)}")
+            if cancelled.is_set():
+                raise CheckCancelled("Check stopped by user", step) from e
+            raise QuotaError(f"Browser error during {step}: {e.msg}", step) from e
         except Exception as e:
-            raise Exception(f"Error: {str(e)}\n{traceback.format_exc()}")
+            if cancelled.is_set():
+                raise CheckCancelled("Check stopped by user", step) from e
+            print(f"[DEBUG] Unexpected error during {step}:\n{traceback.format_exc()}")
+            raise QuotaError(f"Error during {step}: {e}", step) from e
+        finally:
+            # Retried steps add up, so the total shows how long the step really cost
+            elapsed = time.perf_counter() - started
+            self.last_timings[step] = self.last_timings.get(step, 0.0) + elapsed
+            print(f"[DEBUG] Step {step} took {elapsed:.2f}s")
+
+    def _navigate(self, provider, cancelled):
+        if self.driver is None:
+            driver = self._init_driver()
+            with self._driver_lock:
+                if cancelled.is_set():
+                    # Stopped while Firefox was starting; cancel() had nothing to close yet
+                    driver.quit()
+                    raise CheckCancelled("Check stopped by user", STEP_NAVIGATE)
+                self.driver = driver
+
+        print(f"[DEBUG] Navigating to {provider.name} login page...")
+        self.driver.get(provider.login_url)
+
+        # Wait for body to ensure page loaded
+        print("[DEBUG] Waiting for page content...")
+        provider.wait_for_page(self.driver)
+
+    def _read_dashboard(self, provider, account_type, reload=False):
+        if reload:
+            # Resuming after a failed read - the session is still logged in
+            print("[DEBUG] Reloading dashboard...")
+            self.driver.refresh()
+        return provider.read_quota(self.driver, account_type)
 
 if __name__ == "__main__":
     print("Testing QuotaManager (Dry Run)...")
@@ -0,0 +1,202 @@
+import base64
+import secrets
+import threading
+import time
+from multiprocessing.connection import Listener, Client
+
+import keyring
+from cryptography.fernet import Fernet
+
+SERVICE_NAME = "EgyptISPQuotaChecker"
+ACCOUNT_USER = "LocalEncryptionKey" # The 'user' in credential manager for the key
+
+DEFAULT_SESSION_LIFETIME = 15 * 60  # seconds
+
+
+class SecretSession:
+    """
+    Keeps the encryption key unlocked for a limited time.
+
+    Reading the key from the Windows Credential Manager is slow, so it is done once
+    per session instead of on every AccountManager. After `lifetime` seconds (None = until
+    lock() is called) the key is dropped and the next access reads it from keyring again.
+    """
+
+    def __init__(self, lifetime=DEFAULT_SESSION_LIFETIME):
+        self.lifetime = lifetime
+        self._cipher = None
+        self._expires_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_unlocked(self):
+        if self._cipher is None:
+            return False
+        return self._expires_at is None or time.monotonic() < self._expires_at
+
+    def unlock(self):
+        """Load the key from keyring (if not already unlocked) and restart the session timer"""
+        with self._lock:
+            if not self.is_unlocked:
+                self._cipher = Fernet(self._get_or_create_key())
+            self._expires_at = None if self.lifetime is None else time.monotonic() + self.lifetime
+        return self
+
+    def lock(self):
+        """Forget the key. The next access will read it from keyring again."""
+        with self._lock:
+            self._cipher = None
+            self._expires_at = None
+
+    def _get_or_create_key(self):
+        # Try to get key from Windows Credential Manager
+        stored_key = keyring.get_password(SERVICE_NAME, ACCOUNT_USER)
+
+        if stored_key:
+            return base64.urlsafe_b64decode(stored_key)
+        else:
+            # Generate new key
+            new_key = Fernet.generate_key()
+            # Store in Credential Manager (base64 encoded string)
+            keyring.set_password(SERVICE_NAME, ACCOUNT_USER, base64.urlsafe_b64encode(new_key).decode('utf-8'))
+            return new_key
+
+    def _get_cipher(self):
+        cipher = self._cipher
+        if cipher is None or not self.is_unlocked:
+            self.unlock()
+            cipher = self._cipher
+        return cipher
+
+    def encrypt(self, data):
+        return self._get_cipher().encrypt(data)
+
+    def decrypt(self, token):
+        return self._get_cipher().decrypt(token)
+
+    def encrypt_text(self, text):
+        return self.encrypt(text.encode('utf-8')).decode('ascii')
+
+    def decrypt_text(self, token):
+        return self.decrypt(token.encode('ascii')).decode('utf-8')
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def get_session():
+    """The process-wide SecretSession, so keyring is hit at most once per session lifetime"""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = SecretSession()
+        return _default_session
+
+
+class SecretBroker:
+    """
+    Serves decrypted credentials to worker processes over a local authenticated connection
+    (a named pipe on Windows, a Unix socket elsewhere).
+
+    Only the parent process unlocks the key; workers connect with a SecretClient using
+    `address` and `authkey` and ask for one account at a time.
+    """
+
+    def __init__(self, account_manager):
+        self.account_manager = account_manager
+        self.authkey = secrets.token_bytes(32)
+        self._listener = None
+        self._running = False
+
+    @property
+    def address(self):
+        return self._listener.address if self._listener else None
+
+    def start(self):
+        if self._listener:
+            return self
+        self._listener = Listener(authkey=self.authkey)
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"[DEBUG] Secret broker listening on {self.address}")
+        return self
+
+    def stop(self):
+        if not self._listener:
+            return
+        self._running = False
+        # Wake up the accept() call so the thread can exit
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except Exception:
+            pass
+        self._listener.close()
+        self._listener = None
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn = self._listener.accept()
+            except Exception as e:
+                if self._running:
+                    print(f"[DEBUG] Secret broker rejected a connection: {e}")
+                    continue
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                try:
+                    request, account_id = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if request != "get":
+                    conn.send(("error", f"Unknown request: {request}"))
+                    continue
+                account = self.account_manager.get_account(account_id)
+                if account is None:
+                    conn.send(("error", f"Unknown account: {account_id}"))
+                    continue
+                try:
+                    password = self.account_manager.get_password(account)
+                except Exception as e:
+                    conn.send(("error", f"Failed to decrypt password: {e}"))
+                    continue
+                conn.send(("ok", {
+                    "number": account["number"],
+                    "password": password,
+                    "service_type": account["service_type"],
+                    "provider": account["provider"],
+                }))
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class SecretClient:
+    """Fetches credentials from a SecretBroker running in the parent process"""
+
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey
+        self._conn = None
+
+    def get_credentials(self, account_id):
+        """Returns a dict with 'number', 'password', 'service_type' and 'provider'"""
+        if self._conn is None:
+            self._conn = Client(self.address, authkey=self.authkey)
+        self._conn.send(("get", account_id))
+        status, payload = self._conn.recv()
+        if status != "ok":
+            raise KeyError(payload)
+        return payload
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
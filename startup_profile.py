@@ -0,0 +1,207 @@
+"""
+Startup profiling for the GUI and CLI.
+
+    EgyptISPQuota.exe --profile-startup[=report.json] [--startup-budget-ms=1500]
+
+Times every module imported during launch (like `python -X importtime`, but also in the
+frozen build) and the init phases wrapped in `profiler.phase(...)`. The report goes to stderr
+when there is one, and to the JSON file if given (or startup_profile.json when the app has no
+console), so launch time can be tracked against the budget across releases.
+
+The total is measured from process creation where the OS tells us (Windows and Linux), so it
+includes interpreter start-up and the PyInstaller bootloader, which run before any of our
+code. The budget is checked against that figure when it is available.
+
+Keep this module free of heavy imports: it is loaded before everything else.
+"""
+import builtins
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+PROFILE_FLAG = "--profile-startup"
+BUDGET_FLAG = "--startup-budget-ms"
+BUDGET_ENV = "EGYPT_ISP_STARTUP_BUDGET_MS"
+DEFAULT_REPORT_FILE = "startup_profile.json"
+
+
+def _process_age_ms():
+    """Milliseconds since this process was created, or None if the OS doesn't say"""
+    try:
+        if os.name == 'nt':
+            import ctypes
+            from ctypes import wintypes
+
+            kernel32 = ctypes.windll.kernel32
+            created, exited, kernel, user, now = (wintypes.FILETIME() for _ in range(5))
+            if not kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), ctypes.byref(created),
+                                            ctypes.byref(exited), ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+            kernel32.GetSystemTimeAsFileTime(ctypes.byref(now))
+            # FILETIMEs count 100 ns ticks
+            ticks = lambda ft: (ft.dwHighDateTime << 32) | ft.dwLowDateTime
+            return (ticks(now) - ticks(created)) / 10000
+
+        # Both counted from boot: the process start time in clock ticks, and uptime in seconds
+        with open("/proc/self/stat") as f:
+            # The command name can contain spaces, so count fields from after it
+            start_ticks = int(f.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return (uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupProfiler:
+    def __init__(self, report_path=None, budget_ms=None):
+        self.report_path = report_path
+        self.budget_ms = budget_ms
+        self.imports = []  # [name, cumulative seconds, self seconds, depth]
+        self.phases = []  # [name, seconds]
+        self._started = time.perf_counter()
+        self._original_import = None
+        self._stack = []  # time spent in child imports, per import in progress
+        self._reported = False
+
+    def start(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def stop(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Already-loaded modules are the common case; keep them cheap
+        if level == 0 and name in sys.modules and not fromlist:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        loaded_before = len(sys.modules)
+        self._stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            if len(sys.modules) > loaded_before:
+                if level:
+                    package = (globals or {}).get("__package__") or ""
+                    name = f"{package}.{name}" if name else package
+                if fromlist:
+                    name = f"{name} ({', '.join(fromlist)})"
+                self.imports.append([name, elapsed, elapsed - children, len(self._stack)])
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append([name, time.perf_counter() - started])
+
+    def report(self, top=25):
+        """Stop profiling and write the report (only the first call does anything)"""
+        if self._reported:
+            return
+        self._reported = True
+        self.stop()
+
+        total_ms = (time.perf_counter() - self._started) * 1000
+        process_ms = _process_age_ms()
+        launch_ms = total_ms if process_ms is None else process_ms
+        import_ms = sum(cumulative for _, cumulative, _, depth in self.imports if depth == 0) * 1000
+        within_budget = None if self.budget_ms is None else launch_ms <= self.budget_ms
+
+        if process_ms is None:
+            lines = [f"Startup: {total_ms:.0f} ms (imports {import_ms:.0f} ms)"]
+        else:
+            lines = [f"Startup: {process_ms:.0f} ms since process start "
+                     f"({total_ms:.0f} ms in app code, imports {import_ms:.0f} ms)"]
+        if self.budget_ms is not None:
+            verdict = "OK" if within_budget else "OVER BUDGET"
+            lines[0] += f", budget {self.budget_ms:.0f} ms: {verdict}"
+        lines.append("Phases:")
+        for name, seconds in self.phases:
+            lines.append(f"  {seconds * 1000:8.1f} ms  {name}")
+        lines.append(f"Slowest imports (top {top}, cumulative / self):")
+        for name, cumulative, self_time, depth in sorted(self.imports, key=lambda i: -i[1])[:top]:
+            lines.append(f"  {cumulative * 1000:8.1f} / {self_time * 1000:7.1f} ms  {'  ' * depth}{name}")
+        text = "\n".join(lines)
+
+        if sys.stderr is not None:
+            print(text, file=sys.stderr)
+
+        path = self.report_path
+        if path is None and sys.stderr is None:
+            # Windowed build: nowhere to print, so always leave a file
+            path = DEFAULT_REPORT_FILE
+        if path:
+            import json
+
+            with open(path, "w") as f:
+                json.dump({
+                    "process_ms": process_ms,
+                    "total_ms": total_ms,
+                    "import_ms": import_ms,
+                    "budget_ms": self.budget_ms,
+                    "within_budget": within_budget,
+                    "phases": [{"name": n, "ms": s * 1000} for n, s in self.phases],
+                    "imports": [
+                        {"name": n, "cumulative_ms": c * 1000, "self_ms": s * 1000, "depth": d}
+                        for n, c, s, d in self.imports
+                    ],
+                }, f, indent=2)
+
+
+class _NullProfiler:
+    """Stand-in when profiling is off, so callers don't need to check"""
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    def report(self, top=25):
+        pass
+
+
+def _parse_budget(value, source):
+    try:
+        return float(value)
+    except ValueError:
+        # A typo in a profiling option shouldn't stop the app from launching
+        if sys.stderr is not None:
+            print(f"Ignoring {source}: not a number of milliseconds: {value!r}", file=sys.stderr)
+        return None
+
+
+def from_argv(argv=None):
+    """
+    Start a profiler if --profile-startup is in argv (sys.argv by default).
+    The profiling flags are removed from argv so the app's own argument parsing never sees them.
+    """
+    argv = sys.argv if argv is None else argv
+    enabled = False
+    report_path = None
+    budget_ms = os.environ.get(BUDGET_ENV)
+    budget_source = BUDGET_ENV
+
+    for arg in list(argv[1:]):
+        if arg == PROFILE_FLAG or arg.startswith(PROFILE_FLAG + "="):
+            enabled = True
+            report_path = arg.partition("=")[2] or None
+            argv.remove(arg)
+        elif arg.startswith(BUDGET_FLAG + "="):
+            budget_ms = arg.partition("=")[2]
+            budget_source = BUDGET_FLAG
+            argv.remove(arg)
+
+    if not enabled:
+        return _NullProfiler()
+    return StartupProfiler(report_path, _parse_budget(budget_ms, budget_source) if budget_ms else None).start()
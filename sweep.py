@@ -0,0 +1,227 @@
+import os
+import signal
+import subprocess
+import time
+import multiprocessing as mp
+from collections import deque
+from multiprocessing.connection import wait
+
+from secret_store import SecretBroker
+
+DEFAULT_WORKERS = 2
+DEFAULT_DEADLINE = 180  # seconds per account, including QuotaManager's own retries
+DEFAULT_MAX_REASSIGN = 1  # times an account is handed to a fresh worker after its worker was killed
+
+
+def _worker_main(conn, broker_address, authkey, debug_mode):
+    """Worker process: owns one QuotaManager/browser and checks accounts sent by the supervisor"""
+    if os.name != 'nt':
+        # Own process group, so the supervisor can kill geckodriver and Firefox along with us
+        os.setsid()
+
+    # Imported here so the supervisor process never loads Selenium
+    from quota_manager import QuotaManager
+    from quota_errors import QuotaError
+    from secret_store import SecretClient
+
+    quota_manager = QuotaManager()
+    secret_client = SecretClient(broker_address, authkey)
+    try:
+        while True:
+            try:
+                account_id = conn.recv()
+            except EOFError:
+                break
+            if account_id is None:
+                break
+
+            try:
+                creds = secret_client.get_credentials(account_id)
+                quota = quota_manager.get_quota(
+                    creds["number"],
+                    creds["password"],
+                    service_type=creds["service_type"],
+                    debug_mode=debug_mode,
+                    provider=creds["provider"]
+                )
+                conn.send((account_id, "ok", quota))
+            except QuotaError as e:
+                conn.send((account_id, type(e).__name__, str(e)))
+            except Exception as e:
+                conn.send((account_id, "QuotaError", f"Error: {e}"))
+    finally:
+        quota_manager.close()
+        secret_client.close()
+
+
+def _kill_process_tree(process):
+    """Kill a worker together with the geckodriver/Firefox processes it started"""
+    if process.pid is None:
+        return
+    try:
+        if os.name == 'nt':
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, ProcessLookupError):
+        pass
+    if process.is_alive():
+        process.kill()
+    process.join(5)
+
+
+class _Worker:
+    def __init__(self, ctx, broker, debug_mode):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, broker.address, broker.authkey, debug_mode),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.account_id = None
+        self.started_at = None
+
+    def assign(self, account_id):
+        """Hand an account to the worker. Returns False if the worker died while idle."""
+        if not self.process.is_alive():
+            return False
+        try:
+            self.conn.send(account_id)
+        except (OSError, BrokenPipeError):
+            return False
+        self.account_id = account_id
+        self.started_at = time.monotonic()
+        return True
+
+    def stop(self, timeout=10):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            _kill_process_tree(self.process)
+        self.conn.close()
+
+    def kill(self):
+        _kill_process_tree(self.process)
+        self.conn.close()
+
+
+class SweepSupervisor:
+    """
+    Checks many accounts in a pool of worker processes, one browser per worker.
+
+    A worker that crashes or runs past `deadline` is killed along with its browser,
+    replaced by a fresh one, and its account is handed out again (up to `max_reassign` times).
+    Credentials reach the workers through a SecretBroker, so only this process touches keyring.
+    """
+
+    def __init__(self, account_manager, workers=DEFAULT_WORKERS, deadline=DEFAULT_DEADLINE,
+                 max_reassign=DEFAULT_MAX_REASSIGN, debug_mode=False):
+        self.account_manager = account_manager
+        self.workers = max(1, workers)
+        self.deadline = deadline
+        self.max_reassign = max_reassign
+        self.debug_mode = debug_mode
+        # Spawn everywhere: Windows has nothing else, and forking a process with broker threads is unsafe
+        self._ctx = mp.get_context("spawn")
+
+    def run(self, account_ids=None, on_result=None):
+        """
+        Check the given accounts (all accounts by default).
+        Returns {account_id: {"status", "value", "attempts", "elapsed"}} where status is
+        "ok" or the name of the QuotaError subclass. `on_result(account_id, result)` is called
+        as results come in.
+        """
+        if account_ids is None:
+            account_ids = [acc["id"] for acc in self.account_manager.get_accounts()]
+        pending = deque(account_ids)
+        attempts = {}
+        results = {}
+        if not pending:
+            return results
+
+        broker = SecretBroker(self.account_manager).start()
+        workers = []
+        try:
+            workers = [
+                _Worker(self._ctx, broker, self.debug_mode)
+                for _ in range(min(self.workers, len(pending)))
+            ]
+
+            while pending or any(w.account_id for w in workers):
+                for i, worker in enumerate(workers):
+                    if worker.account_id is None and pending:
+                        if not worker.assign(pending[0]):
+                            # Died between accounts; the account never reached it, so it isn't an attempt
+                            print(f"[DEBUG] Replacing idle worker {worker.process.pid} (exited unexpectedly)")
+                            worker.kill()
+                            workers[i] = _Worker(self._ctx, broker, self.debug_mode)
+                            continue
+                        account_id = pending.popleft()
+                        attempts[account_id] = attempts.get(account_id, 0) + 1
+
+                busy = [w for w in workers if w.account_id]
+                wait([w.conn for w in busy] + [w.process.sentinel for w in busy], timeout=0.5)
+
+                for i, worker in enumerate(workers):
+                    account_id = worker.account_id
+                    if account_id is None:
+                        continue
+
+                    elapsed = time.monotonic() - worker.started_at
+                    fault = None
+                    try:
+                        if worker.conn.poll():
+                            _, status, value = worker.conn.recv()
+                            worker.account_id = None
+                            self._record(results, on_result, account_id, status, value, attempts, elapsed)
+                            continue
+                    except (EOFError, OSError):
+                        fault = "worker exited unexpectedly"
+
+                    if fault is None and not worker.process.is_alive():
+                        fault = "worker exited unexpectedly"
+                    if fault is None and elapsed > self.deadline:
+                        fault = f"no result after {self.deadline}s"
+                    if fault is None:
+                        continue
+
+                    print(f"[DEBUG] Killing worker {worker.process.pid} ({fault})")
+                    worker.kill()
+
+                    if attempts[account_id] <= self.max_reassign:
+                        pending.append(account_id)
+                    else:
+                        status = "QuotaTimeoutError" if elapsed > self.deadline else "BrowserCrashError"
+                        self._record(results, on_result, account_id, status,
+                                     f"Check aborted: {fault}", attempts, elapsed)
+
+                    # A fresh worker costs a full interpreter and Selenium import; only start one if there's work left
+                    workers[i] = _Worker(self._ctx, broker, self.debug_mode) if pending else None
+
+                workers = [w for w in workers if w is not None]
+        finally:
+            for worker in workers:
+                worker.stop()
+            broker.stop()
+
+        return results
+
+    def _record(self, results, on_result, account_id, status, value, attempts, elapsed):
+        result = {
+            "status": status,
+            "value": value,
+            "attempts": attempts[account_id],
+            "elapsed": elapsed,
+        }
+        results[account_id] = result
+        if on_result:
+            on_result(account_id, result)
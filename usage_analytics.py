@@ -0,0 +1,224 @@
+"""
+Consumption statistics over the readings in UsageHistory.
+
+Everything works on the column dicts from UsageHistory.load_columns() or make_columns()
+(sorted by account, then time) with whole-array numpy operations, so the cost stays flat as the number of
+accounts and readings grows. Per-account results are arrays indexed by account code;
+columns["account_ids"][code] gives the account id.
+"""
+import time
+
+import numpy as np
+
+DAY = 86400.0
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_ANOMALY_Z = 3.0
+DEFAULT_ANOMALY_MIN_READINGS = 5
+
+
+def _local_utc_offset():
+    if time.localtime().tm_isdst > 0:
+        return -time.altzone
+    return -time.timezone
+
+
+def _first_last_index(account):
+    """Index of the first and last reading of each account"""
+    boundaries = np.nonzero(account[1:] != account[:-1])[0]
+    first = np.concatenate(([0], boundaries + 1))
+    last = np.concatenate((boundaries, [len(account) - 1]))
+    return first, last
+
+
+def empty_columns():
+    """Columns with no readings"""
+    return {
+        "account_ids": [],
+        "account": np.empty(0, dtype=np.int64),
+        "checked_at": np.empty(0, dtype=np.float64),
+        "remaining": np.empty(0, dtype=np.float64),
+    }
+
+
+def make_columns(ids, checked_at, remaining):
+    """Build the column dict from parallel arrays in any order (sorts by account, then time)"""
+    account_ids, account = np.unique(ids, return_inverse=True)
+    order = np.lexsort((checked_at, account))
+    return {
+        "account_ids": account_ids.tolist(),
+        "account": account.reshape(-1)[order].astype(np.int64),
+        "checked_at": checked_at[order],
+        "remaining": remaining[order],
+    }
+
+
+def deltas(columns):
+    """
+    Change between each reading and the previous reading of the same account.
+    Returns (same_account, consumed_gb, elapsed_seconds), one entry per reading after the first.
+    """
+    account = columns["account"]
+    checked_at = columns["checked_at"]
+    remaining = columns["remaining"]
+
+    same = account[1:] == account[:-1]
+    drop = remaining[:-1] - remaining[1:]
+    # Remaining going up is a renewal or top-up, not negative usage
+    consumed = np.where(same & (drop > 0), drop, 0.0)
+    elapsed = np.where(same, checked_at[1:] - checked_at[:-1], 0.0)
+    return same, consumed, elapsed
+
+
+def rolling_rate(columns, window_days=DEFAULT_WINDOW_DAYS):
+    """
+    Consumption rate in GB/day at every reading, over the trailing window.
+    The window reaches back to the last reading before it starts, so sparse checks still
+    get a rate. NaN where the account has no earlier reading.
+    """
+    account = columns["account"]
+    checked_at = columns["checked_at"]
+    if len(account) == 0:
+        return np.empty(0)
+
+    window = window_days * DAY
+    _, consumed, _ = deltas(columns)
+    cumulative = np.concatenate(([0.0], np.cumsum(consumed)))
+
+    # A key that increases across accounts, with each account's times at least a window apart,
+    # lets one searchsorted find every window start
+    t0 = checked_at.min()
+    span = checked_at.max() - t0 + window + 1
+    key = account * span + (checked_at - t0)
+    start = np.searchsorted(key, key - window, side="right") - 1
+
+    first, _ = _first_last_index(account)
+    start = np.maximum(start, first[account])
+
+    elapsed = checked_at - checked_at[start]
+    used = cumulative - cumulative[start]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(elapsed > 0, used / elapsed * DAY, np.nan)
+
+
+def account_stats(columns, now=None, window_days=DEFAULT_WINDOW_DAYS):
+    """
+    Latest state and forecast per account:
+        "remaining":       GB at the last reading
+        "last_checked":    time of the last reading
+        "daily_rate":      GB/day over the trailing window at the last reading
+        "days_left":       remaining / daily_rate (inf when nothing is being used, NaN if unknown)
+        "window_consumed": GB used in the window ending at `now` (e.g. this week)
+    """
+    account = columns["account"]
+    n_accounts = len(columns["account_ids"])
+    if n_accounts == 0:
+        empty = np.empty(0)
+        return {"remaining": empty, "last_checked": empty, "daily_rate": empty,
+                "days_left": empty, "window_consumed": empty}
+
+    now = time.time() if now is None else now
+    _, last = _first_last_index(account)
+    remaining = columns["remaining"][last]
+    daily_rate = rolling_rate(columns, window_days)[last]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_left = np.where(daily_rate > 0, remaining / daily_rate,
+                             np.where(daily_rate == 0, np.inf, np.nan))
+
+    _, consumed, _ = deltas(columns)
+    checked_at = columns["checked_at"][1:]
+    in_window = (checked_at >= now - window_days * DAY) & (checked_at <= now)
+    window_consumed = np.bincount(account[1:][in_window], weights=consumed[in_window], minlength=n_accounts)
+
+    return {
+        "remaining": remaining,
+        "last_checked": columns["checked_at"][last],
+        "daily_rate": daily_rate,
+        "days_left": days_left,
+        "window_consumed": window_consumed,
+    }
+
+
+def local_day(t=None, utc_offset=None):
+    """Day number (days since 1970-01-01, as in daily_consumption) of unix time `t`, now by default"""
+    t = time.time() if t is None else t
+    utc_offset = _local_utc_offset() if utc_offset is None else utc_offset
+    return int((t + utc_offset) // DAY)
+
+
+def daily_consumption(columns, utc_offset=None):
+    """
+    GB used per account per calendar day (local time by default).
+    Usage between two readings is counted on the day of the later one.
+    Returns {"account": codes, "day": days since 1970-01-01, "consumed": GB}, sorted by account, day.
+    """
+    utc_offset = _local_utc_offset() if utc_offset is None else utc_offset
+    _, consumed, _ = deltas(columns)
+    used = consumed > 0
+    account = columns["account"][1:][used]
+    day = np.floor((columns["checked_at"][1:][used] + utc_offset) / DAY).astype(np.int64)
+    if len(day) == 0:
+        return {"account": account, "day": day, "consumed": consumed[used]}
+
+    n_days = day.max() - day.min() + 1
+    keys, inverse = np.unique(account * n_days + (day - day.min()), return_inverse=True)
+    return {
+        "account": keys // n_days,
+        "day": keys % n_days + day.min(),
+        "consumed": np.bincount(inverse, weights=consumed[used]),
+    }
+
+
+def top_consumers(columns, stats, n=5):
+    """The `n` accounts that used the most in the stats window, as (account_id, GB) pairs"""
+    order = np.argsort(-stats["window_consumed"], kind="stable")[:n]
+    return [(columns["account_ids"][i], float(stats["window_consumed"][i])) for i in order]
+
+
+def anomalies(columns, z=DEFAULT_ANOMALY_Z, min_readings=DEFAULT_ANOMALY_MIN_READINGS):
+    """
+    Intervals where an account used data much faster than it usually does:
+    a rate more than `z` standard deviations above that account's mean rate.
+    Accounts with fewer than `min_readings` intervals are skipped.
+    Returns {"account", "checked_at", "rate"} for the flagged intervals (rate in GB/day).
+    """
+    same, consumed, elapsed = deltas(columns)
+    valid = same & (elapsed > 0)
+    account = columns["account"][1:][valid]
+    checked_at = columns["checked_at"][1:][valid]
+    rate = consumed[valid] / elapsed[valid] * DAY
+
+    n_accounts = len(columns["account_ids"])
+    count = np.bincount(account, minlength=n_accounts)
+    total = np.bincount(account, weights=rate, minlength=n_accounts)
+    total_sq = np.bincount(account, weights=rate * rate, minlength=n_accounts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        std = np.sqrt(np.maximum(total_sq / count - mean * mean, 0.0))
+
+    flagged = (count[account] >= min_readings) & (std[account] > 0) & (rate > mean[account] + z * std[account])
+    return {
+        "account": account[flagged],
+        "checked_at": checked_at[flagged],
+        "rate": rate[flagged],
+    }
+
+
+def summarize(columns, now=None, window_days=DEFAULT_WINDOW_DAYS, stats=None):
+    """
+    Per-account stats as plain dicts keyed by account id, for the UI and CLI.
+    Pass `stats` from account_stats() if already computed; `now` and `window_days` are then unused.
+    """
+    if stats is None:
+        stats = account_stats(columns, now=now, window_days=window_days)
+    flagged = np.bincount(anomalies(columns)["account"], minlength=len(columns["account_ids"]))
+    summary = {}
+    for i, account_id in enumerate(columns["account_ids"]):
+        summary[account_id] = {
+            "remaining": float(stats["remaining"][i]),
+            "last_checked": float(stats["last_checked"][i]),
+            "daily_rate": float(stats["daily_rate"][i]),
+            "days_left": float(stats["days_left"][i]),
+            "window_consumed": float(stats["window_consumed"][i]),
+            "anomalies": int(flagged[i]),
+        }
+    return summary
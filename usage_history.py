@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from usage_analytics import empty_columns, make_columns
+
+
+def default_history_file():
+    # Imported here: account_manager pulls in keyring and the crypto stack, which the
+    # analytics (and bench_analytics.py) don't need
+    from account_manager import APP_DATA_DIR
+    return os.path.join(APP_DATA_DIR, "history.db")
+
+
+def parse_quota_gb(quota):
+    """Turn a quota string as returned by QuotaManager ("1,234.5 GB") into a float"""
+    return float(quota.split()[0].replace(",", ""))
+
+
+class UsageHistory:
+    """
+    Remaining-quota readings of every account, one row per successful check.
+    Only account ids, timestamps and numbers are stored, so this file isn't encrypted.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_history_file()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS readings ("
+                    " account_id TEXT NOT NULL,"
+                    " checked_at REAL NOT NULL,"
+                    " remaining_gb REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS readings_account_time ON readings (account_id, checked_at)"
+                )
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # A connection per call keeps this usable from the UI's check thread
+        return sqlite3.connect(self.path)
+
+    def record(self, account_id, quota, checked_at=None):
+        """Store one reading. `quota` is either GB as a number or a QuotaManager string."""
+        remaining_gb = parse_quota_gb(quota) if isinstance(quota, str) else float(quota)
+        checked_at = time.time() if checked_at is None else checked_at
+        self.record_many([(account_id, checked_at, remaining_gb)])
+
+    def record_many(self, rows):
+        """Store (account_id, checked_at, remaining_gb) rows in one transaction"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO readings (account_id, checked_at, remaining_gb) VALUES (?, ?, ?)", rows
+                )
+        finally:
+            conn.close()
+
+    def delete_account(self, account_id):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM readings WHERE account_id = ?", (account_id,))
+        finally:
+            conn.close()
+
+    def load_columns(self, account_ids=None, since=None):
+        """
+        Load readings as columnar arrays sorted by account, then time:
+            "account_ids": list of account ids, indexed by the codes in "account"
+            "account":     int64 account code per reading
+            "checked_at":  float64 unix time per reading
+            "remaining":   float64 remaining GB per reading
+        """
+        query = "SELECT account_id, checked_at, remaining_gb FROM readings"
+        conditions, params = [], []
+        if account_ids is not None:
+            conditions.append(f"account_id IN ({','.join('?' * len(account_ids))})")
+            params.extend(account_ids)
+        if since is not None:
+            conditions.append("checked_at >= ?")
+            params.append(since)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY account_id, checked_at"
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+        if not rows:
+            return empty_columns()
+        ids, checked_at, remaining = zip(*rows)
+        return make_columns(np.array(ids), np.array(checked_at, dtype=np.float64),
+                            np.array(remaining, dtype=np.float64))
+